@@ -1,118 +1,404 @@
 import os
 import sys
 import re
-import jieba
+import math
+import functools
+try:
+    import jieba_fast as jieba  # C 加速版 jieba，接口与 jieba 兼容
+except ImportError:
+    import jieba
+import numpy as np
 from collections import Counter
-from Levenshtein import distance as levenshtein_distance  # 用于计算编辑距离
-from line_profiler_pycharm import profile
+from rapidfuzz.distance.Levenshtein import distance as levenshtein_distance  # 用于计算编辑距离（位并行算法）
+if os.environ.get('LINE_PROFILE'):
+    from line_profiler_pycharm import profile
+else:
+    def profile(func):
+        """未开启逐行性能分析时的空装饰器，不引入额外调用开销"""
+        return func
+try:
+    import simsimd  # 可选依赖：运行时按 CPU 分派 AVX2/AVX-512/NEON/SVE 余弦内核
+except ImportError:
+    simsimd = None
+
+# 预编译的正则表达式，避免每次调用时经过 re 模块缓存查找
+_PUNCT = re.compile(r'[^\w\s]')
+_WS = re.compile(r'\s+')
+# 并行分词时的断行位置：非汉字字符
+_SHARD_BOUNDARY = re.compile(r'[^\u4e00-\u9fd5]')
+# 长文本中去除的常见停用词（固定单字集合，用 str.translate 删除比正则更快）
+_STOP_TBL = str.maketrans('', '', '的了是很我有和也吧啊你他她')
+
+# 两文本长度比低于该值时，编辑距离相似度直接取长度比上界，不再计算编辑距离
+EDIT_RATIO_CUTOFF = 0.05
+# 两文本词数乘积（词级编辑距离 DP 规模）超过该值时，先算余弦相似度，结论明确则跳过编辑距离。
+# rapidfuzz 位并行 DP 在约 2e7 的规模下仅需约 3ms，该阈值对应约 150ms，只对超大文档生效
+LONG_PAIR_PRODUCT = 1_000_000_000
+COSINE_DECISIVE_LOW = 0.1
+COSINE_DECISIVE_HIGH = 0.95
+# 向量维度不低于该值时才使用 simsimd 的近似内核（仅 float32 / int8 输入）
+SIMSIMD_MIN_DIM = 1024
+# 稠密词频向量以 int8 存储，单个词的计数在此饱和
+TF_MAX = 127
+# 特征哈希向量维度（2 的幂，用位与代替取模）
+HASH_DIM = 1 << 16
+HASH_MASK = HASH_DIM - 1
+# 超过该字符数的文本启用 jieba 多进程并行分词，每个分片约含该数量的字符
+PARALLEL_THRESHOLD = 100_000
+PARALLEL_SHARD_SIZE = 10_000
+
+# 在导入时加载分词词典，避免首次分词调用承担加载开销
+jieba.initialize()
 
 @profile
 def read_file(file_path):
-    """读取指定路径的文件内容"""
+    """读取指定路径的文件内容（按文件大小分块读取至文件末尾后整体解码）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
     except FileNotFoundError:
         raise FileNotFoundError(f"文件不存在: {file_path}")
+    try:
+        # st_size 仅作为读取大小的提示：管道、procfs 等文件报告为 0，且单次 os.read 可能读不全
+        chunk_size = max(os.fstat(fd).st_size, 1 << 16)
+        chunks = []
+        while True:
+            chunk = os.read(fd, chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b''.join(chunks).decode('utf-8')
 
 @profile
 def preprocess_text(text):
     """文本预处理：去除标点、多余空白和长文本中的常见停用词"""
     # 去除标点符号
-    text = re.sub(r'[^\w\s]', '', text)
+    text = _PUNCT.sub('', text)
     # 去除多余的空白符
-    text = re.sub(r'\s+', ' ', text).strip()
-    # 长文本去除常见停用词（不计入查重）
+    text = _WS.sub(' ', text).strip()
+    # 长文本去除常见停用词（不计入查重），长度按去除标点和多余空白后的文本计算
     if len(text) > 800:
-        text = re.sub(r'[的了是很我有和也吧啊你他她]', '', text)
+        text = text.translate(_STOP_TBL)
     return text
 
+def _shard_lines(text):
+    """把大文本切成多行供并行分词（并行模式按行分配任务）
+
+    空白直接换成换行；没有空白的超长段落每隔约 PARALLEL_SHARD_SIZE 个字符在非汉字处断行，
+    避免把一个汉语词切开
+    """
+    lines = []
+    for line in text.split(' '):
+        start = 0
+        while len(line) - start > PARALLEL_SHARD_SIZE:
+            match = _SHARD_BOUNDARY.search(line, start + PARALLEL_SHARD_SIZE)
+            if match is None:
+                break
+            lines.append(line[start:match.start()])
+            start = match.start()
+        lines.append(line[start:])
+    return '\n'.join(lines)
+
+def _cut_parallel(text):
+    """多进程并行分词，结束后关闭进程池，后续小文本仍走串行分词（Windows 下不支持，退回串行）"""
+    try:
+        jieba.enable_parallel(os.cpu_count())
+    except NotImplementedError:
+        return list(jieba.cut(text))
+    try:
+        return list(jieba.cut(_shard_lines(text)))
+    finally:
+        jieba.disable_parallel()
+
+def _iter_words(text):
+    """逐个产出精确模式分词结果，过滤空白词"""
+    words = _cut_parallel(text) if len(text) > PARALLEL_THRESHOLD else jieba.cut(text)
+    return (word for word in words if word and not word.isspace())
+
 @profile
 def segment_text(text):
-    """使用Jieba对文本进行分词处理"""
-    words = jieba.lcut(text, cut_all=True)
-    # 过滤空字符串
-    processed_words = [word for word in words if word.strip()]
-    return processed_words
+    """使用Jieba（精确模式）对文本进行分词处理"""
+    return list(_iter_words(text))
 
 @profile
 def calculate_term_frequency(words):
     """计算词频统计"""
     return Counter(words)
 
+@profile
+def build_vocab(*word_lists):
+    """流式构建联合词汇表 {词: 下标}，不拼接中间列表，可直接用于 text_to_vector"""
+    vocabulary = {}
+    for words in word_lists:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+    return vocabulary
+
+def _fill_vector(words, vocabulary):
+    """单次遍历词序列，直接在向量上累加词频（不构建中间 Counter）"""
+    counts = np.zeros(len(vocabulary), dtype=np.int32)
+    for word in words:
+        idx = vocabulary.get(word)
+        if idx is not None:
+            counts[idx] += 1
+    return np.minimum(counts, TF_MAX).astype(np.int8)
+
 @profile
 def text_to_vector(words, vocabulary):
-    """将分词结果转换为基于词汇表的词频向量"""
-    vector = [0] * len(vocabulary)
-    word_count = calculate_term_frequency(words)
-
-    for word, count in word_count.items():
-        if word in vocabulary:
-            idx = vocabulary.index(word)
-            vector[idx] = count
+    """将分词结果转换为基于词汇表的词频向量（vocabulary 为 {词: 下标} 字典）
+
+    向量以 int8 存储以减少内存带宽，词频超过 TF_MAX 时饱和
+    """
+    return _fill_vector(words, vocabulary)
+
+@profile
+def doc_vector(text, vocabulary):
+    """分词、计数与向量化合并为一次遍历：直接由预处理后的文本得到词频向量"""
+    return _fill_vector(_iter_words(text), vocabulary)
+
+@profile
+def hashed_vector(text):
+    """特征哈希：将每个词哈希到固定 HASH_DIM 维向量中计数，无需构建联合词汇表
+
+    str 的哈希值在每个进程中随机化，因此只有同一进程内生成的向量可以相互比较
+    """
+    vector = np.zeros(HASH_DIM, dtype=np.int32)
+    for word in _iter_words(text):
+        vector[hash(word) & HASH_MASK] += 1
     return vector
 
 @profile
-def calculate_edit_distance_similarity(text1, text2):
-    """计算编辑距离相似度（更适合短文本）"""
-    edit_distance = levenshtein_distance(text1, text2)
-    max_length = max(len(text1), len(text2))
+def calculate_edit_distance_similarity(text1, text2, min_similarity=0.0):
+    """计算编辑距离相似度（更适合短文本），text1/text2 可为字符串或词编号序列
+
+    min_similarity 为调用方关心的最低相似度，低于该值时允许提前结束计算
+    """
+    len1, len2 = len(text1), len(text2)
+    max_length = max(len1, len2)
     if max_length == 0:
         return 1.0
+
+    # 相似度上界为 短长度/长长度（短文本恰为长文本子串时取到），长度悬殊时直接返回上界
+    upper_bound = min(len1, len2) / max_length
+    if upper_bound < EDIT_RATIO_CUTOFF or upper_bound < min_similarity:
+        return upper_bound
+
+    # 编辑距离超过 score_cutoff 后 rapidfuzz 会提前放弃计算
+    score_cutoff = max_length - int(max_length * min_similarity)
+    edit_distance = levenshtein_distance(text1, text2, score_cutoff=score_cutoff)
     return 1 - (edit_distance / max_length)
 
 @profile
-def calculate_cosine_similarity(vec1, vec2):
-    """计算两个向量的余弦相似度"""
-    vec1 = [float(i) for i in vec1]
-    vec2 = [float(i) for i in vec2]
+def encode_tokens(words1, words2):
+    """将两组分词结果映射为共享编号的整数序列，供词级编辑距离使用"""
+    id_map = {}
+    seq1 = [id_map.setdefault(word, len(id_map)) for word in words1]
+    seq2 = [id_map.setdefault(word, len(id_map)) for word in words2]
+    return seq1, seq2
+
+def _cosine_kernel(a, b):
+    """单次遍历同时累加点积与两个模长平方，由 numba JIT 编译为 SIMD 代码"""
+    dot = 0.0
+    na = 0.0
+    nb = 0.0
+    for i in range(a.shape[0]):
+        x = a[i]
+        y = b[i]
+        dot += x * y
+        na += x * x
+        nb += y * y
+    if na == 0.0 or nb == 0.0:
+        return 0.0
+    return dot / ((na * nb) ** 0.5)
+
+@functools.lru_cache(maxsize=None)
+def _get_cosine_njit():
+    """首次计算稠密向量余弦相似度时才导入 numba（可选依赖）并编译内核，未安装时返回 None
+
+    延迟导入避免命令行查重（只走 Counter 路径）承担 numba 的导入与编译开销
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit('f8(f8[::1], f8[::1])', fastmath=True, cache=True)(_cosine_kernel)
+
+def _norm(vec):
+    """计算向量（或词频值序列）的 L2 模长"""
+    return math.sqrt(sum(x * x for x in vec))
+
+def _use_simsimd(a, b, norm1, norm2):
+    """simsimd 内核使用近似计算，只用于未传入模长的大维度 float32 / int8 向量"""
+    return (simsimd is not None and norm1 is None and norm2 is None
+            and a.dtype == b.dtype and a.dtype in (np.float32, np.int8)
+            and a.shape[0] >= SIMSIMD_MIN_DIM)
+
+def _cosine_simsimd(a, b):
+    """simsimd 返回余弦距离；零向量的距离约定与本模块不同，需单独处理"""
+    if not a.any() or not b.any():
+        return 0.0
+    return 1.0 - float(simsimd.cosine(a, b))
+
+def _cosine_int8(vec1, vec2, norm1=None, norm2=None):
+    """int8 词频向量的余弦相似度：大维度时使用 simsimd 的 i8 内核，否则提升为 int64 做精确整数累加"""
+    a = np.ascontiguousarray(vec1)
+    b = np.ascontiguousarray(vec2)
+
+    if _use_simsimd(a, b, norm1, norm2):
+        return _cosine_simsimd(a, b)
+
+    a = a.astype(np.int64)
+    b = b.astype(np.int64)
+    if norm1 is None:
+        norm1 = math.sqrt(int(a @ a))
+    if norm2 is None:
+        norm2 = math.sqrt(int(b @ b))
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+
+    return int(a @ b) / (norm1 * norm2)
+
+@profile
+def calculate_cosine_similarity(vec1, vec2, norm1=None, norm2=None):
+    """计算两个向量的余弦相似度（可传入预先计算的模长）
+
+    大维度的 float32 / int8 向量使用 simsimd 近似内核；其余输入按 float64 精确计算，
+    未传入模长时优先使用 numba JIT 内核，否则使用 NumPy 向量化计算
+    """
+    if getattr(vec1, 'dtype', None) == np.int8 and getattr(vec2, 'dtype', None) == np.int8:
+        return _cosine_int8(vec1, vec2, norm1, norm2)
+
+    if isinstance(vec1, np.ndarray) and isinstance(vec2, np.ndarray) and _use_simsimd(vec1, vec2, norm1, norm2):
+        return _cosine_simsimd(np.ascontiguousarray(vec1), np.ascontiguousarray(vec2))
+
+    a = np.ascontiguousarray(vec1, dtype=np.float64)
+    b = np.ascontiguousarray(vec2, dtype=np.float64)
+    # numba 内核不做越界检查，长度不一致时需先报错，与 NumPy 路径行为一致
+    if a.shape != b.shape:
+        raise ValueError(f"向量长度不一致: {a.shape} 与 {b.shape}")
+
+    if norm1 is None and norm2 is None:
+        cosine_njit = _get_cosine_njit()
+        if cosine_njit is not None:
+            return float(cosine_njit(a, b))
 
-    dot_product = sum(x * y for x, y in zip(vec1, vec2))
-    magnitude1 = sum(x **2 for x in vec1)** 0.5
-    magnitude2 = sum(x **2 for x in vec2)** 0.5
+    if norm1 is None:
+        norm1 = float(np.linalg.norm(a))
+    if norm2 is None:
+        norm2 = float(np.linalg.norm(b))
 
-    if magnitude1 == 0 or magnitude2 == 0:
+    if norm1 == 0 or norm2 == 0:
         return 0.0
 
-    return dot_product / (magnitude1 * magnitude2)
+    return float(a @ b) / (norm1 * norm2)
+
+@profile
+def cosine_counters(counter1, counter2, norm1=None, norm2=None):
+    """直接在两个词频 Counter 上计算余弦相似度，无需构建联合词汇表
+
+    norm1/norm2 为预先计算好的模长，多次比较同一文档时可避免重复计算
+    """
+    if norm1 is None:
+        norm1 = _norm(counter1.values())
+    if norm2 is None:
+        norm2 = _norm(counter2.values())
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+
+    if len(counter1) > len(counter2):
+        counter1, counter2 = counter2, counter1
+
+    # 只遍历较小的 Counter，复杂度 O(min(|c1|, |c2|))
+    dot_product = 0
+    for word, count in counter1.items():
+        dot_product += count * counter2.get(word, 0)
+
+    return dot_product / (norm1 * norm2)
+
+@functools.lru_cache(maxsize=128)
+def _doc_features(file_path, mtime_ns, size):
+    """计算单个文档的特征：(预处理文本, 分词元组, 词频 Counter, 词频模长)
+
+    以路径、修改时间和文件大小为缓存键，文件改动后自动重新计算；
+    返回的 Counter 为缓存共享对象，调用方不应修改
+    """
+    processed_text = preprocess_text(read_file(file_path))
+    words = tuple(segment_text(processed_text))
+    counter = calculate_term_frequency(words)
+    return processed_text, words, counter, _norm(counter.values())
+
+@profile
+def load_document(file_path):
+    """获取文档特征（带缓存），见 _doc_features"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"文件不存在: {file_path}")
+    return _doc_features(file_path, stat.st_mtime_ns, stat.st_size)
 
 @profile
 def calculate_similarity(file_path1, file_path2, cosine_weight=0.7, edit_distance_weight=0.3):
-    """综合计算两个文本文件的相似度（余弦相似度+编辑距离相似度加权）"""
-    # 读取文件内容
-    raw_text1 = read_file(file_path1)
-    raw_text2 = read_file(file_path2)
+    """综合计算两个文本文件的相似度（余弦相似度+编辑距离相似度加权）
 
-    # 文本预处理
-    processed_text1 = preprocess_text(raw_text1)
-    processed_text2 = preprocess_text(raw_text2)
+    超大文档（词数乘积超过 LONG_PAIR_PRODUCT）在余弦相似度很低或很高时跳过编辑距离计算，
+    以余弦相似度代替编辑距离项
+    """
+    # 读取、预处理、分词并统计词频（按文件缓存，批量比较时每个文件只处理一次）
+    processed_text1, text1_words, counter1, norm1 = load_document(file_path1)
+    processed_text2, text2_words, counter2, norm2 = load_document(file_path2)
 
     if not processed_text1 or not processed_text2:
         raise ValueError("错误：存在空文件，无法进行查重！请检查输入文件。")
 
-    # 文本分词
-    text1_words = segment_text(processed_text1)
-    text2_words = segment_text(processed_text2)
-
-    # 构建联合词汇表
-    vocabulary = list(set(text1_words + text2_words))
-    
-    # 转换为词频向量
-    vector1 = text_to_vector(text1_words, vocabulary)
-    vector2 = text_to_vector(text2_words, vocabulary)
-
     # 计算余弦相似度
-    cosine_similarity = calculate_cosine_similarity(vector1, vector2)
+    cosine_similarity = cosine_counters(counter1, counter2, norm1, norm2)
     print(f"余弦相似度：{cosine_similarity:.4f}")
-    
-    # 计算编辑距离相似度
-    edit_similarity = calculate_edit_distance_similarity(processed_text1, processed_text2)
-    print(f"编辑距离相似度：{edit_similarity:.4f}")
+
+    if len(text1_words) * len(text2_words) > LONG_PAIR_PRODUCT and not (
+            COSINE_DECISIVE_LOW <= cosine_similarity <= COSINE_DECISIVE_HIGH):
+        # 超大文档且余弦相似度结论明确：跳过编辑距离，以余弦相似度代替编辑距离项，仍按调用方权重加权
+        edit_similarity = cosine_similarity
+    else:
+        # 计算编辑距离相似度（以词为编辑单位，DP 规模远小于逐字符）
+        seq1, seq2 = encode_tokens(text1_words, text2_words)
+        edit_similarity = calculate_edit_distance_similarity(seq1, seq2)
+        print(f"编辑距离相似度：{edit_similarity:.4f}")
     
     # 加权计算最终相似度
     final_similarity = (cosine_weight * cosine_similarity) + (edit_distance_weight * edit_similarity)
     return final_similarity
 
+@profile
+def calculate_similarity_matrix(file_paths):
+    """批量计算多个文本文件两两之间的余弦相似度矩阵
+
+    将所有文档的词频组装为 (N, |V|) 的 CSR 稀疏矩阵并按行 L2 归一化，
+    一次稀疏矩阵乘法 M @ M.T 即得到全部两两相似度
+    """
+    # 延迟导入 scipy：命令行查重不调用本函数，无需承担其导入开销
+    from scipy.sparse import csr_matrix
+
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for file_path in file_paths:
+        processed_text, _, counter, norm = load_document(file_path)
+        if not processed_text:
+            raise ValueError(f"错误：存在空文件，无法进行查重！请检查输入文件: {file_path}")
+        # 利用缓存的模长直接写入归一化后的词频
+        for word, count in counter.items():
+            indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            data.append(count / norm)
+        indptr.append(len(indices))
+
+    matrix = csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+        shape=(len(file_paths), len(vocabulary))
+    )
+    return (matrix @ matrix.T).toarray()
+
 @profile
 def main():
     """主函数：处理命令行参数并执行查重计算"""
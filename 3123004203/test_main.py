@@ -1,15 +1,26 @@
 import unittest
 import os
 import tempfile
+from unittest import mock
+from collections import Counter
+import numpy as np
+import plagiarism_checker
 from plagiarism_checker import (  # 假设原代码文件名为plagiarism_checker.py
     read_file,
     preprocess_text,
     segment_text,
     calculate_term_frequency,
+    build_vocab,
     text_to_vector,
+    doc_vector,
+    hashed_vector,
+    TF_MAX,
     calculate_edit_distance_similarity,
     calculate_cosine_similarity,
-    calculate_similarity
+    cosine_counters,
+    encode_tokens,
+    calculate_similarity,
+    calculate_similarity_matrix
 )
 
 class TestPlagiarismChecker(unittest.TestCase):
@@ -48,6 +59,10 @@ class TestPlagiarismChecker(unittest.TestCase):
         short_text = "这是我的测试文本，很简单的"
         processed_short = preprocess_text(short_text)
         self.assertEqual(processed_short, "这是我的测试文本很简单的")
+        
+        # 长度按合并空白后的文本计算：空白较多但实际字符不足800的文本保留停用词
+        spaced_text = "的" + " " * 1000 + "测试"
+        self.assertEqual(preprocess_text(spaced_text), "的 测试")
     
     # 测试用例5：测试文本分词功能
     def test_segment_text(self):
@@ -76,9 +91,15 @@ class TestPlagiarismChecker(unittest.TestCase):
     # 测试用例8：测试向量生成
     def test_text_to_vector(self):
         words = ["测试", "文本", "测试"]
-        vocabulary = ["测试", "文本", "单元"]
+        vocabulary = {"测试": 0, "文本": 1, "单元": 2}
         vector = text_to_vector(words, vocabulary)
-        self.assertEqual(vector, [2, 1, 0])  # 测试:2次，文本:1次，单元:0次
+        self.assertEqual(vector.tolist(), [2, 1, 0])  # 测试:2次，文本:1次，单元:0次
+        # 向量可直接用于余弦相似度计算
+        self.assertAlmostEqual(
+            calculate_cosine_similarity(vector, text_to_vector(["测试", "文本"], vocabulary)),
+            calculate_cosine_similarity([2, 1, 0], [1, 1, 0]),
+            places=4
+        )
     
     # 测试用例9：测试编辑距离相似度
     def test_edit_distance_similarity(self):
@@ -99,6 +120,12 @@ class TestPlagiarismChecker(unittest.TestCase):
         # 空文本
         self.assertEqual(calculate_edit_distance_similarity("", ""), 1.0)
         self.assertEqual(calculate_edit_distance_similarity("", "测试"), 0.0)
+        # 长度悬殊时直接返回长度比上界
+        self.assertAlmostEqual(
+            calculate_edit_distance_similarity("a", "a" * 40),
+            1 / 40,
+            places=6
+        )
     
     # 测试用例10：测试余弦相似度
     def test_cosine_similarity(self):
@@ -114,6 +141,15 @@ class TestPlagiarismChecker(unittest.TestCase):
         )
         # 零向量
         self.assertEqual(calculate_cosine_similarity([0, 0], [1, 2]), 0.0)
+        # 大维度 float32 向量（可能使用 simsimd 内核），结果与精确值一致
+        vec1 = np.arange(2048, dtype=np.float32) % 7
+        vec2 = np.arange(2048, dtype=np.float32) % 5
+        self.assertAlmostEqual(
+            calculate_cosine_similarity(vec1, vec2),
+            calculate_cosine_similarity(vec1.tolist(), vec2.tolist()),
+            places=4
+        )
+        self.assertEqual(calculate_cosine_similarity(np.zeros(2048, dtype=np.float32), vec2), 0.0)
     
     # 测试用例11：测试综合相似度计算
     def test_calculate_similarity(self):
@@ -158,6 +194,174 @@ class TestPlagiarismChecker(unittest.TestCase):
         # 清理临时文件
         os.unlink(path1)
         os.unlink(path2)
+    
+    # 测试用例13：测试基于 Counter 的稀疏余弦相似度
+    def test_cosine_counters(self):
+        # 与稠密向量的计算结果一致
+        self.assertAlmostEqual(
+            cosine_counters(Counter({"a": 1, "b": 1}), Counter({"a": 1, "b": 2})),
+            calculate_cosine_similarity([1, 1], [1, 2]),
+            places=6
+        )
+        # 没有公共词
+        self.assertEqual(cosine_counters(Counter({"a": 1}), Counter({"b": 3})), 0.0)
+        # 空 Counter
+        self.assertEqual(cosine_counters(Counter(), Counter({"a": 1})), 0.0)
+        # 传入预先计算的模长，结果不变
+        c1, c2 = Counter({"a": 1, "b": 1}), Counter({"a": 1, "b": 2})
+        self.assertAlmostEqual(
+            cosine_counters(c1, c2, 2 ** 0.5, 5 ** 0.5),
+            cosine_counters(c1, c2),
+            places=6
+        )
+    
+    # 测试用例14：测试词级编辑距离的整数编码
+    def test_encode_tokens(self):
+        seq1, seq2 = encode_tokens(["测试", "文本", "测试"], ["文本", "单元"])
+        self.assertEqual(seq1, [0, 1, 0])
+        self.assertEqual(seq2, [1, 2])
+        # 一处词替换，词级编辑相似度为 1 - 1/3
+        seq1, seq2 = encode_tokens(["这是", "测试", "文本"], ["这是", "测试", "文档"])
+        self.assertAlmostEqual(
+            calculate_edit_distance_similarity(seq1, seq2),
+            2 / 3,
+            places=4
+        )
+    
+    # 测试用例15：测试批量相似度矩阵
+    def test_calculate_similarity_matrix(self):
+        contents = [
+            "这是一段用于测试的文本内容",
+            "这是一段用于测试的文本内容",
+            "今天天气晴朗适合出门散步"
+        ]
+        paths = []
+        for content in contents:
+            with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as f:
+                f.write(content)
+                paths.append(f.name)
+        
+        matrix = calculate_similarity_matrix(paths)
+        self.assertEqual(matrix.shape, (3, 3))
+        # 对角线为自身相似度 1，矩阵对称
+        for i in range(3):
+            self.assertAlmostEqual(float(matrix[i, i]), 1.0, places=4)
+        self.assertAlmostEqual(float(matrix[0, 1]), 1.0, places=4)
+        self.assertAlmostEqual(float(matrix[0, 2]), float(matrix[2, 0]), places=6)
+        self.assertLess(float(matrix[0, 2]), 0.3)
+        
+        for path in paths:
+            os.unlink(path)
+    
+    # 测试用例16：测试联合词汇表构建
+    def test_build_vocab(self):
+        vocabulary = build_vocab(["测试", "文本", "测试"], ["文本", "单元"])
+        self.assertEqual(vocabulary, {"测试": 0, "文本": 1, "单元": 2})
+        self.assertEqual(build_vocab(), {})
+        # 与 text_to_vector 配合使用
+        vector = text_to_vector(["单元", "测试"], vocabulary)
+        self.assertEqual(vector.tolist(), [1, 0, 1])
+    
+    # 测试用例17：测试由文本直接生成词频向量
+    def test_doc_vector(self):
+        text = "这是一段测试文本"
+        vocabulary = build_vocab(segment_text(text), ["单元"])
+        vector = doc_vector(text, vocabulary)
+        self.assertEqual(vector.tolist(), text_to_vector(segment_text(text), vocabulary).tolist())
+        self.assertEqual(vector[vocabulary["单元"]], 0)
+        # 词频在 int8 上限处饱和
+        vector = text_to_vector(["测试"] * 200, {"测试": 0})
+        self.assertEqual(int(vector[0]), 127)
+    
+    # 测试用例18：测试特征哈希向量
+    def test_hashed_vector(self):
+        vector1 = hashed_vector("这是一段测试文本")
+        vector2 = hashed_vector("这是一段测试文本")
+        self.assertEqual(int(vector1.sum()), len(segment_text("这是一段测试文本")))
+        # 维度固定，可直接计算余弦相似度
+        self.assertEqual(vector1.shape, vector2.shape)
+        self.assertAlmostEqual(calculate_cosine_similarity(vector1, vector2), 1.0, places=4)
+        self.assertEqual(int(hashed_vector("").sum()), 0)
+    
+    # 测试用例19：测试读取报告大小为 0 的管道
+    @unittest.skipUnless(os.path.isdir("/dev/fd"), "需要 /dev/fd 支持")
+    def test_read_file_pipe(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, "测试文本".encode('utf-8'))
+        os.close(write_fd)
+        try:
+            content = read_file(f"/dev/fd/{read_fd}")
+        finally:
+            os.close(read_fd)
+        self.assertEqual(content, "测试文本")
+    
+    # 测试用例20：测试 int8 词频向量的饱和与余弦相似度
+    def test_int8_vector_cosine(self):
+        vocabulary = {"测试": 0, "文本": 1}
+        vector = text_to_vector(["测试"] * (TF_MAX + 50) + ["文本"], vocabulary)
+        self.assertEqual(vector.dtype, np.int8)
+        self.assertEqual(vector.tolist(), [TF_MAX, 1])
+        
+        vec1 = np.array([1, 1, 0], dtype=np.int8)
+        vec2 = np.array([1, 2, 0], dtype=np.int8)
+        # 不传模长
+        self.assertAlmostEqual(calculate_cosine_similarity(vec1, vec2), 0.94868, places=4)
+        # 传入预先计算的模长（走 int64 整数累加路径）
+        self.assertAlmostEqual(
+            calculate_cosine_similarity(vec1, vec2, 2 ** 0.5, 5 ** 0.5),
+            0.94868,
+            places=4
+        )
+        # 饱和值的平方累加不会溢出
+        saturated = np.full(4096, TF_MAX, dtype=np.int8)
+        self.assertAlmostEqual(calculate_cosine_similarity(saturated, saturated, None, None), 1.0, places=4)
+        self.assertEqual(calculate_cosine_similarity(np.zeros(3, dtype=np.int8), vec2), 0.0)
+    
+    # 测试用例21：测试综合相似度按调用方权重加权（短文本同样适用）
+    def test_calculate_similarity_weights(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as f1, \
+             tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as f2:
+            f1.write("这是一段用于测试的文本内容")
+            f2.write("这是一段用于测试的文本内容")
+            path1, path2 = f1.name, f2.name
+        
+        # 相同文本的余弦与编辑距离相似度均为 1，结果等于权重之和
+        similarity = calculate_similarity(path1, path2, cosine_weight=0.5, edit_distance_weight=0.3)
+        self.assertAlmostEqual(similarity, 0.8, places=4)
+        
+        os.unlink(path1)
+        os.unlink(path2)
+    
+    # 测试用例22：测试超大文档在余弦相似度明确时跳过编辑距离
+    def test_calculate_similarity_long_text_skip(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as f1, \
+             tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as f2:
+            # 词袋相同、词序相反：余弦相似度为 1，编辑距离相似度小于 1
+            f1.write("苹果 香蕉 橘子 葡萄")
+            f2.write("葡萄 橘子 香蕉 苹果")
+            path1, path2 = f1.name, f2.name
+        
+        # 未达到阈值：正常计算编辑距离
+        self.assertLess(calculate_similarity(path1, path2), 0.99)
+        
+        # 超过阈值：编辑距离项以余弦相似度代替，仍按权重加权
+        with mock.patch.object(plagiarism_checker, "LONG_PAIR_PRODUCT", 0):
+            with mock.patch.object(plagiarism_checker, "calculate_edit_distance_similarity") as edit_mock:
+                similarity = calculate_similarity(path1, path2, cosine_weight=0.6, edit_distance_weight=0.2)
+                edit_mock.assert_not_called()
+        self.assertAlmostEqual(similarity, 0.8, places=4)
+        
+        os.unlink(path1)
+        os.unlink(path2)
+    
+    # 测试用例23：测试长度不一致的向量（无论是否安装 numba 均应报错）
+    def test_cosine_similarity_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            calculate_cosine_similarity(np.ones(3), np.ones(5))
+        with self.assertRaises(ValueError):
+            calculate_cosine_similarity(np.ones(1000), np.ones(3))
+        with self.assertRaises(ValueError):
+            calculate_cosine_similarity([1, 2], [1, 2, 3], 5 ** 0.5, 14 ** 0.5)
 
 if __name__ == '__main__':
     unittest.main()